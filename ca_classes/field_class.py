@@ -28,7 +28,16 @@ class Field:
 
         if cell_states is None:
             cell_states = np.full(dimension, 1) #maybe should change 1 for a constant like FUEL
-        self.cell_states = cell_states
+        cell_states = np.asarray(cell_states)
+
+        # Immutable snapshot of the initial state, restored in place on every reset
+        self.original_state = np.array(cell_states, copy=True)
+        self.original_state.setflags(write=False)
+
+        # Two preallocated ping-pong buffers: cell_states always points to the current one
+        self._state_buffers = [np.array(cell_states, copy=True), np.empty_like(cell_states)]
+        self._current_buffer = 0
+        self.cell_states = self._state_buffers[self._current_buffer]
 
         if cell_height is None:
             cell_height = np.zeros(dimension)
@@ -43,7 +52,6 @@ class Field:
         self.cell_veg_density = np.full(dimension, cell_veg_density)
 
         self.cell_size = cell_size
-        self.original_state = self.cell_states
 
         self.field_cond_fig, ax1 = plt.subplots(2, 2, figsize=(8, 6))
         ax1[0, 0].set_title('Cell Heights')
@@ -68,17 +76,85 @@ class Field:
 
     def set_states(self, state_mat):
         '''
-        TO DO add funtionality to make sure is adding correct type of data and size
-        :param state_mat:
+        Writes state_mat into the current state buffer. If its dtype differs, both buffers are reallocated with that
+        dtype so no value is truncated.
+        :param state_mat: matrix with the same shape as the field.
         :return:
         '''
-        self.cell_states = state_mat
+        if np.shape(state_mat) != self.cell_states.shape:
+            raise ValueError(f'State matrix of shape {np.shape(state_mat)} does not match the field shape '
+                             f'{self.cell_states.shape}')
+        state_mat = np.asarray(state_mat)
+        if state_mat.dtype != self.cell_states.dtype:
+            self._state_buffers = [np.array(state_mat, copy=True), np.empty_like(state_mat)]
+            self._current_buffer = 0
+            self.cell_states = self._state_buffers[self._current_buffer]
+        else:
+            np.copyto(self.cell_states, state_mat)
 
     def set_heights(self, heights_mat):
         self.cell_heigh = heights_mat
 
+    def get_next_state_buffer(self):
+        """ Returns the buffer that is not currently holding cell_states, to be written by the next period.
+        """
+        return self._state_buffers[1 - self._current_buffer]
+
+    def swap_state_buffers(self):
+        """ Makes the buffer written by the last period the current cell_states.
+        """
+        self._current_buffer = 1 - self._current_buffer
+        self.cell_states = self._state_buffers[self._current_buffer]
+        return self.cell_states
+
     def reset_state(self):
-        self.cell_states = self.original_state
+        self._current_buffer = 0
+        self.cell_states = self._state_buffers[self._current_buffer]
+        np.copyto(self.cell_states, self.original_state)
+
+    def coarsen(self, factor):
+        """ Returns a new Field where every block of factor x factor cells is aggregated into a single cell.
+        Heights and vegetation are averaged, a coarse cell is burning if any of its cells is burning and has fuel if
+        any of its cells has fuel. Edges that do not fill a whole block are padded with their border values.
+        :param factor: number of fine cells per coarse cell along each dimension.
+        :return: the coarse Field, built from the initial state of this one.
+        """
+        coarse_dimension = [-(-dim // factor) for dim in self.dimension]
+
+        def blocks(layer):
+            padding = [(0, c_dim * factor - dim) for dim, c_dim in zip(self.dimension, coarse_dimension)]
+            layer = np.pad(np.asarray(layer), padding, mode='edge')
+            return layer.reshape(coarse_dimension[0], factor, coarse_dimension[1], factor).swapaxes(1, 2).reshape(
+                coarse_dimension + [factor * factor])
+
+        state_blocks = blocks(self.original_state)
+        coarse_states = state_blocks.max(axis=-1)
+        coarse_states[np.any(state_blocks == 1, axis=-1)] = 1
+        coarse_states[np.any(state_blocks == 2, axis=-1)] = 2
+
+        return Field(dimension=coarse_dimension,
+                     wind_velocity=self.wind_velocity,
+                     wind_direction=self.wind_direction,
+                     cell_states=coarse_states,
+                     cell_height=blocks(self.cell_heigh).mean(axis=-1),
+                     cell_veg_type=blocks(self.cell_veg_type).mean(axis=-1),
+                     cell_veg_density=blocks(self.cell_veg_density).mean(axis=-1),
+                     cell_size=self.cell_size * factor)
+
+    def sub_field(self, region):
+        """ Returns a new Field restricted to a rectangular region of this one.
+        :param region: tuple of slices, one per dimension.
+        :return: the cropped Field, built from the initial state of this one.
+        """
+        cell_states = self.original_state[region]
+        return Field(dimension=list(cell_states.shape),
+                     wind_velocity=self.wind_velocity,
+                     wind_direction=self.wind_direction,
+                     cell_states=cell_states,
+                     cell_height=self.cell_heigh[region],
+                     cell_veg_type=self.cell_veg_type[region],
+                     cell_veg_density=self.cell_veg_density[region],
+                     cell_size=self.cell_size)
 
     def plot(self):
         plt.draw()
@@ -51,10 +51,14 @@ class Fire_simulation:
                 still_fire = False
         if self.plot:
             plt.close(fig2)
-        return self.field.cell_states
+        return self.field.cell_states.copy()
 
     def evolve(self):
-        new_cell_states = np.copy(self.field.cell_states)
+        """ Advances the simulation one period. The returned array is one of the field's state buffers, so it is only
+        valid until the next call to evolve.
+        """
+        new_cell_states = self.field.get_next_state_buffer()
+        np.copyto(new_cell_states, self.field.cell_states)
         for coord in itertools.product(*[range(dim) for dim in self.field.dimension]):
             if Fire_simulation.verbose: print(f'Evaluated cell: {coord}')
             if self.field.cell_states[coord] == 1:
@@ -63,8 +67,7 @@ class Fire_simulation:
                     new_cell_states[coord] = 2
             elif self.field.cell_states[coord] == 2:
                 new_cell_states[coord] = 3
-        self.field.cell_states = new_cell_states
-        return new_cell_states
+        return self.field.swap_state_buffers()
 
     def get_cell_prob_no_burn(self, coord):
         coord_neigs = self.neighborhood_obj.calculate_cell_neighbor_coordinates(coord, self.field.dimension)
@@ -0,0 +1,167 @@
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+
+from ca_classes.fire_simulation_class import Fire_simulation
+from ca_classes.MCE_class import MCE
+
+
+class MultiResolutionMCE:
+    """ Monte Carlo experiment run in two passes. A cheap experiment on a coarsened field finds the region where the
+    burn probability is not negligible, and the full resolution experiment is only run inside that region plus a
+    safety margin. Cells outside the region get a burn probability of 0 in the final map. If the fine fire reaches an
+    inner edge of the region, the region is widened and the fine pass rerun, at most max_widenings times.
+    """
+
+    final_res_fig = None
+    coarse_time = None
+    fine_time = None
+    region = None
+
+    def __init__(self, ca_fire_simul, rep_number, coarse_factor = 4, coarse_rep_number = None,
+                 prob_threshold = 0.01, margin = 2, max_widenings = 2):
+        self.ca_fire_simul = ca_fire_simul
+        self.rep_number = rep_number
+        self.coarse_factor = coarse_factor
+        if coarse_rep_number is None:
+            coarse_rep_number = rep_number
+        self.coarse_rep_number = coarse_rep_number
+        self.prob_threshold = prob_threshold
+        self.margin = margin
+        self.max_widenings = max_widenings
+        self.fine_pass_count = 0
+        dimension = self.ca_fire_simul.field.dimension
+        self.coarse_avg = None
+        self.running_avg = np.zeros(dimension)
+        self.running_var = np.zeros(dimension)
+
+    def run(self):
+        field = self.ca_fire_simul.field
+        factor = self.coarse_factor
+
+        start = time.perf_counter()
+        coarse_simul = self.build_coarse_simulation()
+        coarse_MCE = MCE(coarse_simul, self.coarse_rep_number)
+        self.coarse_avg = coarse_MCE.run()
+        plt.close(coarse_MCE.final_res_fig)
+        self.region = self.get_screened_region(self.coarse_avg)
+        self.coarse_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fine_MCE = self.run_fine_pass(self.region)
+        self.fine_pass_count = 1
+        widened_region = self.widen_region(self.region, fine_MCE.running_avg)
+        while widened_region != self.region and self.fine_pass_count <= self.max_widenings:
+            print(f'Fire reaches the edge of region {[(r.start, r.stop) for r in self.region]}, widening it to '
+                  f'{[(r.start, r.stop) for r in widened_region]}')
+            self.region = widened_region
+            fine_MCE = self.run_fine_pass(self.region)
+            self.fine_pass_count += 1
+            widened_region = self.widen_region(self.region, fine_MCE.running_avg)
+        if widened_region != self.region:
+            print(f'Warning: fire still reaches the edge of region {[(r.start, r.stop) for r in self.region]} after '
+                  f'{self.max_widenings} widenings, the burn probability outside it is underestimated')
+        self.fine_time = time.perf_counter() - start
+
+        self.running_avg = np.zeros(field.dimension)
+        self.running_avg[self.region] = fine_MCE.running_avg
+        self.running_var = np.zeros(field.dimension)
+        self.running_var[self.region] = fine_MCE.running_var
+
+        print(f'Coarse pass (x{factor}): {self.coarse_time:.2f} s, region {[(r.start, r.stop) for r in self.region]}')
+        print(f'Fine pass: {self.fine_time:.2f} s over {self.fine_pass_count} pass(es)')
+
+        self.final_res_fig, ax = plt.subplots(figsize=(8, 6))
+        ax.set_title("Probability of burned cell")
+        avg = ax.imshow(self.running_avg)
+        self.final_res_fig.colorbar(avg, ax=ax)
+
+        return self.running_avg
+
+    def run_fine_pass(self, region):
+        """ Runs the full resolution experiment restricted to region.
+        :return: the MCE object of the fine pass.
+        """
+        sub_field = self.ca_fire_simul.field.sub_field(region)
+        plt.close(sub_field.field_cond_fig)
+        fine_origin = [tuple(c - r.start for c, r in zip(coord, region)) for coord in self.ca_fire_simul.fire_origin]
+        fine_simul = self.build_child_simulation(sub_field, fine_origin, self.ca_fire_simul.max_period_num,
+                                                 self.ca_fire_simul.C3, self.ca_fire_simul.plot)
+        fine_MCE = MCE(fine_simul, self.rep_number)
+        fine_MCE.run()
+        plt.close(fine_MCE.final_res_fig)
+        self.ca_fire_simul.first_sim = fine_simul.first_sim
+        return fine_MCE
+
+    def build_coarse_simulation(self):
+        """ Builds the simulation on the coarsened field. One coarse period stands for coarse_factor fine periods, and
+        C3 is scaled down since the height difference between coarse neighbors spans coarse_factor fine cells.
+        """
+        factor = self.coarse_factor
+        coarse_field = self.ca_fire_simul.field.coarsen(factor)
+        plt.close(coarse_field.field_cond_fig)
+        coarse_origin = list(dict.fromkeys(tuple(c // factor for c in coord)
+                                           for coord in self.ca_fire_simul.fire_origin))
+        return self.build_child_simulation(coarse_field, coarse_origin,
+                                           -(-self.ca_fire_simul.max_period_num // factor),
+                                           self.ca_fire_simul.C3 / factor)
+
+    def build_child_simulation(self, field, fire_origin, max_period_num, C3, plot=False):
+        """ Builds a simulation on field with the same neighborhood and fire parameters as the user's simulation,
+        except for C3. first_sim is carried over so the plot only waits for input once.
+        """
+        child_simul = Fire_simulation(field, fire_origin, max_period_num, plot)
+        child_simul.neighborhood_obj = self.ca_fire_simul.neighborhood_obj
+        child_simul.first_sim = self.ca_fire_simul.first_sim
+        child_simul.set_fire_parameters(self.ca_fire_simul.p_h, self.ca_fire_simul.C1, self.ca_fire_simul.C2, C3)
+        return child_simul
+
+    def widen_region(self, region, fine_avg):
+        """ Widens region by margin coarse cells (at least one) on every side whose edge cells have a burn probability
+        above prob_threshold, since the edge of the sub field acts as a firebreak. Edges of the real field are left
+        as they are.
+        :return: the widened region, equal to region if the fire never reaches its inner edges.
+        """
+        step = max(self.margin, 1) * self.coarse_factor
+        dimension = self.ca_fire_simul.field.dimension
+        widened_region = []
+        for axis, (r, dim) in enumerate(zip(region, dimension)):
+            start, stop = r.start, r.stop
+            if start > 0 and np.any(np.take(fine_avg, 0, axis=axis) > self.prob_threshold):
+                start = max(start - step, 0)
+            if stop < dim and np.any(np.take(fine_avg, -1, axis=axis) > self.prob_threshold):
+                stop = min(stop + step, dim)
+            widened_region.append(slice(start, stop))
+        return tuple(widened_region)
+
+    def get_screened_region(self, coarse_avg):
+        """ Bounding box, in fine cells, of the coarse cells whose burn probability exceeds prob_threshold, widened by
+        margin coarse cells and always containing the fire origins.
+        :return: tuple of slices, one per dimension.
+        """
+        factor = self.coarse_factor
+        dimension = self.ca_fire_simul.field.dimension
+        burned = np.argwhere(coarse_avg > self.prob_threshold) * factor
+        origins = np.array(self.ca_fire_simul.fire_origin)
+        cells = np.concatenate([burned, origins]) if len(burned) else origins
+
+        lower = cells.min(axis=0) // factor * factor - self.margin * factor
+        upper = (cells.max(axis=0) // factor + 1 + self.margin) * factor
+        return tuple(slice(int(max(low, 0)), int(min(up, dim))) for low, up, dim in zip(lower, upper, dimension))
+
+    def plot(self):
+        plt.show()
+
+
+if __name__ == '__main__':
+    from ca_classes import field_class, fire_simulation_class
+
+    field_obj = field_class.Field([300, 300])
+
+    fire_simul_obj = fire_simulation_class.Fire_simulation(field_obj, [(150, 150)], 40)
+
+    multi_res_MCE_obj = MultiResolutionMCE(fire_simul_obj, 10, coarse_factor=5)
+
+    final_prob_burn = multi_res_MCE_obj.run()
+
+    multi_res_MCE_obj.plot()